@@ -1,47 +1,102 @@
 import pandas as pd
 import numpy as np
 from sklearn.cluster import DBSCAN
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics.pairwise import cosine_similarity, euclidean_distances
+from sklearn.neighbors import NearestNeighbors
 from config import TRACK_CLUSTERING_PARAMS, DEFAULT_CLUSTERING_PARAMS, FEATURE_COLUMNS
 
+# Prefer the multi-threaded C++ DBSCAN from the `dbscan` package; fall back to sklearn
+try:
+    from dbscan import DBSCAN as ParallelDBSCAN
+except ImportError:
+    ParallelDBSCAN = None
 
-def cluster_track_data(data: pd.DataFrame, track_name: str, n_samples_per_driver: int = 800) -> pd.DataFrame:
-    """Apply DBSCAN clustering to track-specific data."""
-    # Sample data evenly across drivers
-    sampled_data = []
-    for driver in data['Driver'].unique():
-        driver_data = data[data['Driver'] == driver]
-        if len(driver_data) > n_samples_per_driver:
-            driver_sample = driver_data.sample(n_samples_per_driver, random_state=42)
+# GPU DBSCAN for large datasets, used only when explicitly requested
+try:
+    from cuml.cluster import DBSCAN as cuDBSCAN
+except ImportError:
+    cuDBSCAN = None
+
+
+def zscore(matrix: np.ndarray) -> np.ndarray:
+    """Standardize columns to zero mean and unit variance; constant columns are only centered."""
+    mean = matrix.mean(axis=0)
+    std = matrix.std(axis=0)
+    std[std == 0] = 1.0
+    return (matrix - mean) / std
+
+
+def build_neighbor_graph(features_scaled: np.ndarray, eps: float):
+    """Sparse eps-neighborhood distance graph, reusable across DBSCAN runs with eps' <= eps."""
+    # float32 halves memory traffic in the neighbor queries, which sklearn runs in parallel
+    features_scaled = np.ascontiguousarray(features_scaled, dtype=np.float32)
+    nn = NearestNeighbors(radius=eps, algorithm='ball_tree', leaf_size=40, n_jobs=-1).fit(features_scaled)
+    return nn.radius_neighbors_graph(features_scaled, mode='distance')
+
+
+def run_dbscan(features_scaled: np.ndarray, params: dict, backend: str = 'cpu') -> np.ndarray:
+    """Run DBSCAN on the GPU (backend='cuml') or CPU, falling back to CPU if cuML is unavailable or fails."""
+    if backend == 'cuml':
+        if cuDBSCAN is None:
+            print("Warning: cuML not installed, falling back to CPU DBSCAN")
         else:
-            driver_sample = driver_data
-        sampled_data.append(driver_sample)
-    
-    clustered_data = pd.concat(sampled_data, ignore_index=True)
+            try:
+                dbscan = cuDBSCAN(eps=params['eps'], min_samples=params['min_samples'], output_type='numpy')
+                return np.asarray(dbscan.fit_predict(np.ascontiguousarray(features_scaled, dtype=np.float32)))
+            except Exception as e:
+                print(f"Warning: cuML DBSCAN failed ({e}), falling back to CPU DBSCAN")
+    
+    if ParallelDBSCAN is not None:
+        # The C++ wrapper requires a contiguous float64 array
+        features_scaled = np.ascontiguousarray(features_scaled, dtype=np.float64)
+        clusters, _ = ParallelDBSCAN(features_scaled, eps=params['eps'], min_samples=params['min_samples'])
+        return clusters
+    
+    neighbor_graph = build_neighbor_graph(features_scaled, params['eps'])
+    dbscan = DBSCAN(eps=params['eps'], min_samples=params['min_samples'], metric='precomputed')
+    return dbscan.fit_predict(neighbor_graph)
+
+
+def cluster_track_data(data: pd.DataFrame, track_name: str, n_samples_per_driver: int = 800,
+                       backend: str = 'cpu') -> pd.DataFrame:
+    """Apply DBSCAN clustering to track-specific data."""
+    # Full-track scaling stats attached by load_track_data, if available
+    feature_mean = data.attrs.get('feature_mean')
+    feature_std = data.attrs.get('feature_std')
+    
+    # Sample data evenly across drivers; drivers with few samples keep all their rows
+    counts = data.groupby('Driver', sort=False)['Driver'].transform('size')
+    small_idx = data.index[counts <= n_samples_per_driver]
+    large_idx = (data[counts > n_samples_per_driver]
+                 .groupby('Driver', sort=False)
+                 .sample(n=n_samples_per_driver, random_state=42)
+                 .index)
+    clustered_data = data.loc[small_idx.union(large_idx)].reset_index(drop=True)
     
     # Prepare features for clustering
-    features_matrix = clustered_data[FEATURE_COLUMNS].values
+    features_matrix = clustered_data[FEATURE_COLUMNS].to_numpy(dtype=np.float32, copy=True)
     
-    # Handle infinite and NaN values
-    features_matrix = np.nan_to_num(features_matrix, nan=0.0, posinf=999999, neginf=-999999)
+    # Handle infinite and NaN values in place on the owned copy
+    np.nan_to_num(features_matrix, copy=False, nan=0.0, posinf=999999, neginf=-999999)
     
     # Standardize features
-    scaler = StandardScaler()
-    features_scaled = scaler.fit_transform(features_matrix)
+    if feature_mean is not None and feature_std is not None:
+        mean = np.array([feature_mean[col] for col in FEATURE_COLUMNS])
+        std = np.array([feature_std[col] for col in FEATURE_COLUMNS])
+        features_scaled = (features_matrix - mean) / std
+    else:
+        features_scaled = zscore(features_matrix)
     
     # Get track-specific parameters
     params = TRACK_CLUSTERING_PARAMS.get(track_name, DEFAULT_CLUSTERING_PARAMS)
     
     # Apply DBSCAN
-    dbscan = DBSCAN(eps=params['eps'], min_samples=params['min_samples'])
-    clusters = dbscan.fit_predict(features_scaled)
+    clusters = run_dbscan(features_scaled, params, backend)
     
     clustered_data['Cluster'] = clusters
     
     # Print clustering results
-    n_clusters = len(set(clusters)) - (1 if -1 in clusters else 0)
-    n_noise = list(clusters).count(-1)
+    n_clusters = int(clusters.max()) + 1 if (clusters >= 0).any() else 0
+    n_noise = int(np.sum(clusters == -1))
     print(f"{track_name} Clustering: {n_clusters} patterns, {n_noise} noise points ({n_noise/len(clusters)*100:.1f}%)")
     
     return clustered_data
@@ -49,45 +104,39 @@ def cluster_track_data(data: pd.DataFrame, track_name: str, n_samples_per_driver
 
 def analyze_driving_style_similarity(clustered_data: pd.DataFrame, track_name: str = "Track") -> tuple:
     """Analyze driving style similarities between drivers."""
-    driver_profiles = {}
-    
-    for driver in clustered_data['Driver'].unique():
-        driver_data = clustered_data[clustered_data['Driver'] == driver]
-        
-        if len(driver_data) == 0:
-            continue
-            
-        # Create comprehensive driving style profile with safe calculations
-        profile = {
-            'avg_speed': driver_data['Speed'].mean(),
-            'speed_variability': driver_data['Speed'].std(),
-            'max_speed': driver_data['Speed'].max(),
-            'throttle_aggression': driver_data['Throttle'].mean(),
-            'throttle_smoothness': 1 / (driver_data['ThrottleRate'].mean() + 0.001),
-            'brake_frequency': driver_data['nBrake'].mean(),
-            'brake_intensity': driver_data['BrakeIntensity'].mean(),
-            'gear_efficiency': driver_data['GearEfficiency'].mean(),
-            'acceleration_pattern': driver_data['Acceleration'].mean(),
-            'acceleration_variability': driver_data['Acceleration'].std(),
-        }
-        
-        # Safe cornering and straight line calculations
-        low_speed_data = driver_data[driver_data['Speed'] < driver_data['Speed'].quantile(0.3)]
-        high_speed_data = driver_data[driver_data['Speed'] > driver_data['Speed'].quantile(0.7)]
-        
-        profile['cornering_style'] = low_speed_data['Throttle'].mean() if len(low_speed_data) > 0 else driver_data['Throttle'].mean()
-        profile['straight_line_style'] = high_speed_data['Throttle'].mean() if len(high_speed_data) > 0 else driver_data['Throttle'].mean()
-        
-        # Replace NaN values with 0
-        for key, value in profile.items():
-            if pd.isna(value):
-                profile[key] = 0.0
-        
-        driver_profiles[driver] = profile
+    grouped = clustered_data.groupby('Driver', sort=False)
+    
+    # Create comprehensive driving style profiles in a single vectorized pass
+    profiles = grouped.agg(
+        avg_speed=('Speed', 'mean'),
+        speed_variability=('Speed', 'std'),
+        max_speed=('Speed', 'max'),
+        throttle_aggression=('Throttle', 'mean'),
+        throttle_smoothness=('ThrottleRate', 'mean'),
+        brake_frequency=('nBrake', 'mean'),
+        brake_intensity=('BrakeIntensity', 'mean'),
+        gear_efficiency=('GearEfficiency', 'mean'),
+        acceleration_pattern=('Acceleration', 'mean'),
+        acceleration_variability=('Acceleration', 'std'),
+    )
+    profiles['throttle_smoothness'] = 1 / (profiles['throttle_smoothness'] + 0.001)
+    
+    # Safe cornering and straight line calculations using per-driver speed quantiles
+    speed = clustered_data['Speed']
+    throttle = clustered_data['Throttle']
+    low_speed = speed < grouped['Speed'].transform('quantile', 0.3)
+    high_speed = speed > grouped['Speed'].transform('quantile', 0.7)
+    profiles['cornering_style'] = (throttle.where(low_speed).groupby(clustered_data['Driver'], sort=False).mean()
+                                   .fillna(profiles['throttle_aggression']))
+    profiles['straight_line_style'] = (throttle.where(high_speed).groupby(clustered_data['Driver'], sort=False).mean()
+                                       .fillna(profiles['throttle_aggression']))
+    
+    # Replace NaN values with 0
+    driver_profiles = profiles.fillna(0.0).to_dict(orient='index')
     
     if len(driver_profiles) < 2:
         print("Warning: Not enough drivers for similarity analysis")
-        return np.array([]), np.array([]), list(driver_profiles.keys()), driver_profiles
+        return np.array([]), np.array([]), list(driver_profiles.keys()), driver_profiles, np.array([])
     
     # Convert to matrix for similarity analysis
     drivers = list(driver_profiles.keys())
@@ -96,14 +145,18 @@ def analyze_driving_style_similarity(clustered_data: pd.DataFrame, track_name: s
                               for driver in drivers])
     
     # Handle infinite values
-    profile_matrix = np.nan_to_num(profile_matrix, nan=0.0, posinf=999999, neginf=-999999)
+    np.nan_to_num(profile_matrix, copy=False, nan=0.0, posinf=999999, neginf=-999999)
     
     # Standardize features
-    scaler = StandardScaler()
-    profile_matrix_scaled = scaler.fit_transform(profile_matrix)
-    
-    # Calculate similarity matrices
-    similarity_matrix = cosine_similarity(profile_matrix_scaled)
-    distance_matrix = euclidean_distances(profile_matrix_scaled)
-    
-    return similarity_matrix, distance_matrix, drivers, driver_profiles
+    profile_matrix_scaled = zscore(profile_matrix)
+    
+    # Calculate similarity matrices from a single Gram matrix
+    gram = profile_matrix_scaled @ profile_matrix_scaled.T
+    sq_norms = np.diag(gram)
+    norms = np.sqrt(sq_norms)
+    norms[norms == 0] = 1.0
+    similarity_matrix = gram / np.outer(norms, norms)
+    distance_matrix = np.sqrt(np.maximum(sq_norms[:, None] + sq_norms[None, :] - 2 * gram, 0))
+    np.fill_diagonal(distance_matrix, 0.0)
+    
+    return similarity_matrix, distance_matrix, drivers, driver_profiles, profile_matrix_scaled
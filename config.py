@@ -8,6 +8,10 @@ TEAMS = {
     'McLaren': ['PIA', 'NOR']
 }
 
+# Reverse lookups derived from TEAMS
+DRIVER_TO_TEAM = {driver: team for team, drivers in TEAMS.items() for driver in drivers}
+SECOND_DRIVERS = {drivers[1] for drivers in TEAMS.values() if len(drivers) > 1}
+
 # Enhanced team colors with better visibility
 TEAM_COLORS = {
     'Williams': '#37BEDD',    # Bright cyan blue
@@ -46,5 +50,6 @@ RADAR_METRICS = [
 DATA_PATHS = {
     'telemetry': 'telemetry-data',  # Fixed to match your system
     'qualifying': 'Qualifying',
-    'race': 'Race'
+    'race': 'Race',
+    'feature_cache': 'cache/features'  # Engineered per-track features
 }
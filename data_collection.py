@@ -1,6 +1,7 @@
 import fastf1
 import pandas as pd
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 # os.makedirs('cache', exist_ok=True)
 # # q = os.getcwd()
@@ -8,29 +9,33 @@ import os
 
 fastf1.Cache.enable_cache('cache')
 
+def extract_and_write(session, gp: str, driver: str, mode: str):
+    driver_lap = session.laps.pick_drivers(driver).pick_fastest()
+    driver_tel = driver_lap.get_car_data()
+
+    print(f'GP- {gp};Driver - {driver}')
+
+    try:
+        match mode:
+            case 'Q':
+                path = f"new-telemetry/Qualifying/{gp}-quali-{driver}.csv"
+            case 'R':
+                path = f"new-telemetry/Race/{gp}-race-{driver}.csv"
+    except:
+        print(f"Path issue")
+
+    driver_tel = driver_tel.drop(labels=["Date", "Time", "SessionTime"], axis=1)
+    driver_tel.to_csv(path, index=False, compression=None, lineterminator='\n')
+
 def get_fastest_lap( year: int, gp: list, drivers: list, mode: str):
     for i in gp:
         try:
             session = fastf1.get_session(year, i, mode)
             session.load()
 
-            for j in drivers:
-                driver_lap = session.laps.pick_drivers(j).pick_fastest()
-                driver_tel = driver_lap.get_car_data()
-
-                print(f'GP- {i};Driver - {j}')
-
-                try:
-                    match mode:
-                        case 'Q':
-                            path = f"new-telemetry/Qualifying/{i}-quali-{j}.csv"
-                        case 'R':
-                            path = f"new-telemetry/Race/{i}-race-{j}.csv"
-                except:
-                    print(f"Path issue")
-
-                driver_tel = driver_tel.drop(labels=["Date", "Time", "SessionTime"], axis=1)
-                driver_tel.to_csv(path, index=False)
+            # Session is loaded once per track; per-driver extraction runs concurrently
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                list(executor.map(lambda j: extract_and_write(session, i, j, mode), drivers))
 
         except:
             print(f"Data not found for {i}")
@@ -1,5 +1,6 @@
 from typing import Optional
 import os
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
 from processing import load_track_data
@@ -15,13 +16,14 @@ def analyze_track_driving_styles(clustered_data, track_name: str, output_dir: Op
     print(f"{'='*60}")
     
     # Perform similarity analysis
-    similarity_matrix, distance_matrix, drivers, driver_profiles = analyze_driving_style_similarity(
+    similarity_matrix, distance_matrix, drivers, driver_profiles, profile_matrix_scaled = analyze_driving_style_similarity(
         clustered_data, track_name
     )
     
     # Create visualization
     fig, pca_result = create_driving_style_visualizations(
-        similarity_matrix, distance_matrix, drivers, driver_profiles, clustered_data, track_name
+        similarity_matrix, distance_matrix, drivers, driver_profiles, clustered_data, track_name,
+        profile_matrix_scaled
     )
     
     # Save plot if output directory specified
@@ -35,7 +37,8 @@ def analyze_track_driving_styles(clustered_data, track_name: str, output_dir: Op
     return fig, driver_profiles
 
 
-def analyze_single_track(track_name: str, output_dir: Optional[str] = None, show_plots: bool = True):
+def analyze_single_track(track_name: str, output_dir: Optional[str] = None, show_plots: bool = True,
+                         backend: str = 'cpu'):
     """Analyze a single track."""
     print(f"\n{'='*40}")
     print(f"ANALYZING {track_name.upper()}")
@@ -52,7 +55,7 @@ def analyze_single_track(track_name: str, output_dir: Optional[str] = None, show
         print(f"Data loaded successfully: {len(track_data)} samples")
         
         # Apply clustering
-        clustered_data = cluster_track_data(track_data, track_name)
+        clustered_data = cluster_track_data(track_data, track_name, backend=backend)
         
         # Perform driving style analysis
         fig, driver_profiles = analyze_track_driving_styles(
@@ -68,15 +71,45 @@ def analyze_single_track(track_name: str, output_dir: Optional[str] = None, show
         return None, None
 
 
-def analyze_all_tracks_driving_styles(output_dir: Optional[str] = None, show_plots: bool = True):
-    """Enhanced analysis for all tracks."""
+def _init_plot_worker():
+    """Use a non-interactive matplotlib backend in worker processes."""
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def _analyze_track_worker(track_name: str, output_dir: Optional[str], backend: str):
+    """Analyze a track in a worker process, returning the saved figure path instead of the figure."""
+    fig, driver_profiles = analyze_single_track(track_name, output_dir, False, backend)
+    if fig is None:
+        return None, None
+    plt.close(fig)
+    figure_path = os.path.join(output_dir, f"{track_name}_analysis.png") if output_dir else None
+    return figure_path, driver_profiles
+
+
+def analyze_all_tracks_driving_styles(output_dir: Optional[str] = None, show_plots: bool = True,
+                                      backend: str = 'cpu', parallel: bool = False):
+    """Enhanced analysis for all tracks.
+    
+    With parallel=True each track runs in its own process; plots are only saved to
+    output_dir (never shown) and results hold figure paths instead of figures.
+    """
     available_tracks = ['Australia', 'Bahrain', 'China', 'Japan']
     
     results = {}
-    for track in available_tracks:
-        result = analyze_single_track(track, output_dir, show_plots)
-        if result[0] is not None:
-            results[track] = result
+    if parallel:
+        with ProcessPoolExecutor(max_workers=len(available_tracks), initializer=_init_plot_worker) as executor:
+            futures = {track: executor.submit(_analyze_track_worker, track, output_dir, backend)
+                       for track in available_tracks}
+            for track, future in futures.items():
+                result = future.result()
+                if result[1] is not None:
+                    results[track] = result
+    else:
+        for track in available_tracks:
+            result = analyze_single_track(track, output_dir, show_plots, backend)
+            if result[0] is not None:
+                results[track] = result
     
     print(f"\n{'='*60}")
     print("DRIVING STYLE ANALYSIS COMPLETE!")
@@ -96,17 +129,11 @@ def print_analysis_insights(similarity_matrix, drivers, driver_profiles):
         return
     
     # Find most similar pair
-    max_similarity = 0
-    most_similar_pair = None
-    for i in range(len(drivers)):
-        for j in range(i+1, len(drivers)):
-            similarity = similarity_matrix[i][j]
-            if similarity > max_similarity:
-                max_similarity = similarity
-                most_similar_pair = (drivers[i], drivers[j])
-    
-    if most_similar_pair:
-        print(f"Most similar driving styles: {most_similar_pair[0]} & {most_similar_pair[1]} ({max_similarity:.3f})")
+    upper_i, upper_j = np.triu_indices_from(similarity_matrix, k=1)
+    best = np.argmax(similarity_matrix[upper_i, upper_j])
+    max_similarity = similarity_matrix[upper_i[best], upper_j[best]]
+    most_similar_pair = (drivers[upper_i[best]], drivers[upper_j[best]])
+    print(f"Most similar driving styles: {most_similar_pair[0]} & {most_similar_pair[1]} ({max_similarity:.3f})")
     
     # Identify driving style archetypes
     if driver_profiles:
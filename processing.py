@@ -1,13 +1,84 @@
 import pandas as pd
 import os
-from config import TEAMS, DATA_PATHS
+import glob
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from config import DRIVER_TO_TEAM, SECOND_DRIVERS, DATA_PATHS, FEATURE_COLUMNS
 import numpy as np
 
+# Numba is optional; without it rolling statistics fall back to pandas
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# Use the multi-threaded pyarrow CSV parser when available
+try:
+    import pyarrow  # noqa: F401
+    CSV_READ_OPTIONS = {'engine': 'pyarrow'}
+    FEATHER_AVAILABLE = True
+except ImportError:
+    CSV_READ_OPTIONS = {}
+    FEATHER_AVAILABLE = False
+
+# Telemetry columns read from CSV and their parse dtypes
+TELEMETRY_DTYPES = {
+    'RPM': np.float32,
+    'Speed': np.float32,
+    'nGear': np.int8,
+    'Throttle': np.float32,
+}
+
+SPEED_VARIABILITY_WINDOW = 10
+
+
+def _rolling_std(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing rolling sample std using Welford updates, skipping NaN like pandas."""
+    n = values.size
+    out = np.zeros(n)
+    count = 0
+    mean = 0.0
+    m2 = 0.0
+    for i in range(n):
+        x = values[i]
+        if not np.isnan(x):
+            count += 1
+            delta = x - mean
+            mean += delta / count
+            m2 += delta * (x - mean)
+        if i >= window:
+            old = values[i - window]
+            if not np.isnan(old):
+                count -= 1
+                if count == 0:
+                    mean = 0.0
+                    m2 = 0.0
+                else:
+                    delta = old - mean
+                    mean -= delta / count
+                    m2 -= delta * (old - mean)
+        if count > 1:
+            out[i] = np.sqrt(max(m2, 0.0) / (count - 1))
+    return out
+
+
+if njit is not None:
+    _rolling_std = njit(cache=True)(_rolling_std)
+
+
+def rolling_std(values: np.ndarray, window: int = SPEED_VARIABILITY_WINDOW) -> np.ndarray:
+    """Rolling std with min_periods=1, returning 0 where undefined."""
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    if njit is None:
+        return pd.Series(values).rolling(window, min_periods=1).std().fillna(0).to_numpy()
+    return _rolling_std(values, window)
+
+
 def get_driver_team(driver_code: str) -> str:
     """Get team name for a driver."""
-    for team, drivers in TEAMS.items():
-        if driver_code in drivers:
-            return team
+    team = DRIVER_TO_TEAM.get(driver_code)
+    if team is not None:
+        return team
     print(f"Warning: Driver {driver_code} not found in team mappings")
     return 'Unknown'
 
@@ -61,31 +132,27 @@ def debug_directory_structure():
 
 def is_second_driver(driver_code: str, team: str) -> bool:
     """Check if driver is the second driver for their team."""
-    team_drivers = TEAMS.get(team, [])
-    return len(team_drivers) > 1 and driver_code == team_drivers[1]
+    return driver_code in SECOND_DRIVERS and DRIVER_TO_TEAM[driver_code] == team
 
 
 def process_driver_telemetry(filepath: str, driver_code: str) -> pd.DataFrame:
     """Process individual driver telemetry file."""
     try:
-        df = pd.read_csv(filepath)
+        # Only parse the columns we use, with pinned dtypes
+        columns = pd.read_csv(filepath, nrows=0).columns
+        usecols = [col for col in TELEMETRY_DTYPES if col in columns]
+        usecols += [col for col in ('Brake', 'nBrake') if col in columns][:1]
+        df_clean = pd.read_csv(filepath, usecols=usecols,
+                               dtype={col: TELEMETRY_DTYPES[col] for col in usecols if col in TELEMETRY_DTYPES},
+                               **CSV_READ_OPTIONS)
         
         # Handle different CSV formats - check if Brake column exists
-        if 'Brake' in df.columns:
-            df['nBrake'] = df["Brake"].astype(int)
-            df_clean = df.drop(labels=["Brake"], axis=1, errors='ignore')
-        elif 'nBrake' not in df.columns:
+        if 'Brake' in df_clean.columns:
+            df_clean['nBrake'] = df_clean['Brake'].astype(np.int8)
+            df_clean = df_clean.drop(labels=['Brake'], axis=1)
+        elif 'nBrake' not in df_clean.columns:
             # If no brake data, create dummy column
-            df['nBrake'] = 0
-            df_clean = df.copy()
-        else:
-            df_clean = df.copy()
-        
-        # Drop optional columns that might not exist
-        columns_to_drop = ["Date", "Time", "SessionTime", "Source"]
-        for col in columns_to_drop:
-            if col in df_clean.columns:
-                df_clean = df_clean.drop(labels=[col], axis=1)
+            df_clean['nBrake'] = np.int8(0)
         
         # Ensure required columns exist
         required_cols = ['RPM', 'Speed', 'nGear', 'Throttle']
@@ -94,34 +161,106 @@ def process_driver_telemetry(filepath: str, driver_code: str) -> pd.DataFrame:
             print(f"Warning: Missing columns {missing_cols} for {driver_code}")
             return None
         
-        # Create telemetry features
-        features = pd.DataFrame()
-        features['RPM'] = df_clean['RPM']
-        features['Speed'] = df_clean['Speed']
-        features['nGear'] = df_clean['nGear']
-        features['Throttle'] = df_clean['Throttle']
-        features['nBrake'] = df_clean['nBrake']
+        # Work on the raw NumPy buffers to avoid per-column index alignment
+        rpm = df_clean['RPM'].to_numpy()
+        speed = df_clean['Speed'].to_numpy()
+        gear = df_clean['nGear'].to_numpy()
+        throttle = df_clean['Throttle'].to_numpy()
+        brake = df_clean['nBrake'].to_numpy()
         
         # Advanced features for driving style with error handling
-        features['ThrottleRate'] = df_clean['Throttle'].diff().abs().fillna(0)
-        features['BrakeIntensity'] = df_clean['nBrake'] * df_clean['Speed']
-        features['GearEfficiency'] = df_clean['RPM'] / (df_clean['nGear'] + 1)
-        features['SpeedVariability'] = df_clean['Speed'].rolling(10, min_periods=1).std().fillna(0)
-        features['Acceleration'] = df_clean['Speed'].diff().fillna(0)
+        throttle_rate = np.abs(np.diff(throttle, prepend=throttle[:1])).astype(float)
+        acceleration = np.diff(speed, prepend=speed[:1]).astype(float)
+        throttle_rate[np.isnan(throttle_rate)] = 0
+        acceleration[np.isnan(acceleration)] = 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gear_efficiency = rpm / (gear + 1)
+        speed_variability = rolling_std(speed)
+        
+        # Create telemetry features
+        features = pd.DataFrame({
+            'RPM': rpm,
+            'Speed': speed,
+            'nGear': gear,
+            'Throttle': throttle,
+            'nBrake': brake,
+            'ThrottleRate': throttle_rate,
+            'BrakeIntensity': brake * speed,
+            'GearEfficiency': gear_efficiency,
+            'SpeedVariability': speed_variability,
+            'Acceleration': acceleration,
+        }, index=df_clean.index)
         
-        # Remove infinite values and NaN
-        features = features.replace([np.inf, -np.inf], np.nan).dropna()
+        # Remove infinite values and NaN in a single pass
+        features = features[np.isfinite(features.to_numpy(dtype=np.float64)).all(axis=1)]
         
         # Add metadata
-        features['Driver'] = driver_code
-        features['Team'] = get_driver_team(driver_code)
-        
-        return features
+        return features.assign(Driver=driver_code, Team=get_driver_team(driver_code))
     except Exception as e:
         print(f"Error processing {driver_code}: {e}")
         return None
 
 
+def extract_driver_code(filename: str) -> str:
+    """Extract the 3-letter driver code from a telemetry CSV filename."""
+    # Handle both direct files and files in subdirectories
+    base_filename = os.path.basename(filename)
+    driver_code = base_filename.replace('.csv', '')
+    
+    # If filename is just a 3-letter code, use it directly
+    if len(driver_code) == 3 and driver_code.isupper():
+        return driver_code
+    
+    # Try to extract 3-letter code from longer filename
+    parts = driver_code.split('-')
+    potential_codes = [part for part in parts if len(part) == 3 and part.isupper()]
+    if potential_codes:
+        return potential_codes[0]
+    
+    # Fallback: use the whole filename without extension
+    return driver_code
+
+
+def get_driver_stats(driver_data: pd.DataFrame, driver_code: str) -> dict:
+    """Summary statistics for a driver's processed telemetry."""
+    return {
+        'samples': len(driver_data),
+        'team': get_driver_team(driver_code),
+        'avg_speed': driver_data['Speed'].mean(),
+        'max_speed': driver_data['Speed'].max(),
+        'avg_throttle': driver_data['Throttle'].mean(),
+        'brake_usage': driver_data['nBrake'].mean()
+    }
+
+
+def attach_feature_scaling(combined_data: pd.DataFrame):
+    """Store full-track feature mean/std in attrs so clustering can standardize samples without refitting."""
+    features = combined_data[FEATURE_COLUMNS]
+    combined_data.attrs['feature_mean'] = features.mean().to_dict()
+    combined_data.attrs['feature_std'] = features.std(ddof=0).replace(0, 1).to_dict()
+
+
+def get_feature_cache_path(race_location: str, track_path: str, csv_files: list):
+    """Cache file path keyed on the source CSV names and modification times."""
+    if not FEATHER_AVAILABLE:
+        return None
+    source_state = sorted((filename, os.path.getmtime(os.path.join(track_path, filename)))
+                          for filename in csv_files)
+    key = hashlib.md5(repr(source_state).encode()).hexdigest()[:16]
+    return os.path.join(DATA_PATHS['feature_cache'], f"{race_location}_{key}.feather")
+
+
+def save_feature_cache(combined_data: pd.DataFrame, race_location: str, cache_path: str):
+    """Write engineered features to the cache, replacing stale entries for the track."""
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        for stale_path in glob.glob(os.path.join(os.path.dirname(cache_path), f"{race_location}_*.feather")):
+            os.remove(stale_path)
+        combined_data.to_feather(cache_path)
+    except Exception as e:
+        print(f"Warning: Could not write feature cache {cache_path}: {e}")
+
+
 def load_track_data(race_location: str) -> tuple:
     """Load telemetry data for all drivers from a specific track."""
     all_data = []
@@ -162,46 +301,37 @@ def load_track_data(race_location: str) -> tuple:
                 print(f"  - {item}")
             return None, None
         
+        # Reuse previously engineered features if the source files are unchanged
+        cache_path = get_feature_cache_path(race_location, track_path, csv_files)
+        if cache_path and os.path.exists(cache_path):
+            try:
+                combined_data = pd.read_feather(cache_path)
+                driver_stats = {driver_code: get_driver_stats(driver_data, driver_code)
+                                for driver_code, driver_data in combined_data.groupby('Driver', sort=False)}
+                print(f"Loaded {race_location} features from cache: {cache_path}")
+                attach_feature_scaling(combined_data)
+                return combined_data, driver_stats
+            except Exception as e:
+                print(f"Warning: Could not read feature cache {cache_path}: {e}")
+        
         print(f"Loading {race_location} telemetry data...")
         print(f"Found {len(csv_files)} driver files: {csv_files}")
         
+        driver_files = []
         for filename in csv_files:
-            # Extract driver code from filename
-            # Handle both direct files and files in subdirectories
-            base_filename = os.path.basename(filename)
-            
-            # Try different patterns to extract driver code
-            if base_filename.endswith('.csv'):
-                driver_code = base_filename.replace('.csv', '')
-                
-                # If filename is just a 3-letter code, use it directly
-                if len(driver_code) == 3 and driver_code.isupper():
-                    pass  # driver_code is already correct
-                else:
-                    # Try to extract 3-letter code from longer filename
-                    parts = driver_code.split('-')
-                    potential_codes = [part for part in parts if len(part) == 3 and part.isupper()]
-                    if potential_codes:
-                        driver_code = potential_codes[0]
-                    else:
-                        # Fallback: use the whole filename without extension
-                        driver_code = base_filename.replace('.csv', '')
-            
+            driver_code = extract_driver_code(filename)
             filepath = os.path.join(track_path, filename)
             print(f"Processing {driver_code} from {filepath}")
-            
-            driver_data = process_driver_telemetry(filepath, driver_code)
-            
+            driver_files.append((filepath, driver_code))
+        
+        # Each file is independent and pandas/NumPy release the GIL for most of the work
+        with ThreadPoolExecutor(max_workers=min(10, len(driver_files))) as executor:
+            results = list(executor.map(lambda args: process_driver_telemetry(*args), driver_files))
+        
+        for (_, driver_code), driver_data in zip(driver_files, results):
             if driver_data is not None and len(driver_data) > 0:
                 all_data.append(driver_data)
-                driver_stats[driver_code] = {
-                    'samples': len(driver_data),
-                    'team': get_driver_team(driver_code),
-                    'avg_speed': driver_data['Speed'].mean(),
-                    'max_speed': driver_data['Speed'].max(),
-                    'avg_throttle': driver_data['Throttle'].mean(),
-                    'brake_usage': driver_data['nBrake'].mean()
-                }
+                driver_stats[driver_code] = get_driver_stats(driver_data, driver_code)
                 print(f"  ✓ Loaded {len(driver_data)} samples for {driver_code}")
             else:
                 print(f"  ✗ Failed to process data for {driver_code}")
@@ -209,6 +339,9 @@ def load_track_data(race_location: str) -> tuple:
         if all_data:
             combined_data = pd.concat(all_data, ignore_index=True)
             print(f"Successfully loaded {len(all_data)} drivers with {len(combined_data)} total samples")
+            if cache_path:
+                save_feature_cache(combined_data, race_location, cache_path)
+            attach_feature_scaling(combined_data)
             return combined_data, driver_stats
         else:
             print(f"No valid data loaded for {race_location}")
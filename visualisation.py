@@ -1,20 +1,33 @@
 import matplotlib.pyplot as plt
 import numpy as np
 import seaborn as sns
-from sklearn.decomposition import PCA
-from sklearn.preprocessing import StandardScaler
 import pandas as pd
 
 from config import TEAMS, TEAM_COLORS
 from processing import get_driver_team, is_second_driver
 
+
+def _pca(matrix, n_components):
+    """Project rows onto the top principal components via a thin SVD."""
+    centered = matrix - matrix.mean(axis=0)
+    _, singular_values, components = np.linalg.svd(centered.astype(np.float32), full_matrices=False)
+    components = components[:n_components]
+    # Deterministic signs, matching sklearn's PCA convention
+    max_abs_cols = np.argmax(np.abs(components), axis=1)
+    components *= np.sign(components[np.arange(n_components), max_abs_cols])[:, None]
+    explained_variance = singular_values ** 2
+    variance_ratio = explained_variance[:n_components] / explained_variance.sum()
+    return centered @ components.T, variance_ratio
+
+
 def create_driving_style_visualizations(
     similarity_matrix,
     distance_matrix,
     drivers,
     driver_profiles,
     clustered_data,
-    track_name
+    track_name,
+    profile_matrix_scaled
 ):
     """Create comprehensive driving style visualizations with error handling."""
     
@@ -45,22 +58,11 @@ def create_driving_style_visualizations(
     ax2 = fig.add_subplot(gs[0, 1])  # Now occupies one column for equal space
     pca_result = np.array([])
     
-    if len(driver_profiles) >= 2:
+    if len(driver_profiles) >= 2 and profile_matrix_scaled.size > 0:
         try:
-            features = list(next(iter(driver_profiles.values())).keys())
-            profile_matrix = np.array([[driver_profiles[driver][feature] for feature in features] 
-                                  for driver in drivers])
-            
-            # Handle infinite and NaN values
-            profile_matrix = np.nan_to_num(profile_matrix, nan=0.0, posinf=999999, neginf=-999999)
-            
-            # Standardize features
-            scaler = StandardScaler()
-            profile_matrix_scaled = scaler.fit_transform(profile_matrix)
-            
             # Apply PCA
-            pca = PCA(n_components=min(2, len(features), len(drivers)))
-            pca_result = pca.fit_transform(profile_matrix_scaled)
+            pca_result, variance_ratio = _pca(profile_matrix_scaled,
+                                              min(2, profile_matrix_scaled.shape[1], len(drivers)))
 
             # Plot each driver
             for i, driver in enumerate(drivers):
@@ -77,7 +79,6 @@ def create_driving_style_visualizations(
             ax2.axvline(x=0, color='black', linestyle='--', alpha=0.5, linewidth=1)
             
             # Labels and title
-            variance_ratio = pca.explained_variance_ratio_
             ax2.set_xlabel(f'PC1 ({variance_ratio[0]:.1%} variance)', 
                            fontweight='bold', fontsize=12)
             ax2.set_ylabel(f'PC2 ({variance_ratio[1]:.1%} variance)' if len(variance_ratio) > 1 else 'PC2', 
@@ -113,29 +114,14 @@ def create_driving_style_visualizations(
 
     if len(driver_profiles) > 0:
         try:
-            # Prepare radar data
-            radar_data = []
-            for driver in drivers:
-                driver_radar = []
-                for metric in radar_metrics:
-                    if metric in driver_profiles[driver]:
-                        value = driver_profiles[driver][metric]
-                        all_values = [driver_profiles[d][metric] for d in drivers 
-                                     if metric in driver_profiles[d] and not pd.isna(driver_profiles[d][metric])]
-                        if len(all_values) > 1:
-                            min_val, max_val = min(all_values), max(all_values)
-                            normalized = (value - min_val) / (max_val - min_val) if max_val != min_val else 0.5
-                        else:
-                            normalized = 0.5
-                    else:
-                        normalized = 0.5
-                    
-                    # Ensure normalized value is valid
-                    if pd.isna(normalized) or np.isinf(normalized):
-                        normalized = 0.5
-                    
-                    driver_radar.append(normalized)
-                radar_data.append(driver_radar)
+            # Prepare radar data: min-max normalize each metric across drivers
+            profiles_df = (pd.DataFrame.from_dict(driver_profiles, orient='index')
+                           .reindex(index=drivers, columns=radar_metrics)
+                           .replace([np.inf, -np.inf], np.nan))
+            metric_min = profiles_df.min()
+            metric_range = (profiles_df.max() - metric_min).replace(0, np.nan)
+            normed = ((profiles_df - metric_min) / metric_range).fillna(0.5).clip(0, 1)
+            radar_data = normed.to_numpy().tolist()
 
             # Set up angles for radar chart
             angles = np.linspace(0, 2 * np.pi, len(radar_metrics), endpoint=False).tolist()